@@ -5,11 +5,17 @@ import json
 import os
 import pytz
 
+from flask import jsonify, request
 from twap_engine import launch_system, order_scheduler as scheduler
 from twap_engine.db import (
     get_submitted_orders,
     get_scheduled_jobs
 )
+from twap_engine.profiler import (
+    start_profiling,
+    stop_profiling,
+    slow_slices
+)
 from twap_engine.encryption_utils import encrypt_data, decrypt_data, generate_key
 
 # ------------------- Initialization -------------------
@@ -263,6 +269,33 @@ def update_submitted_orders(n):
 def update_scheduled_jobs(n):
     return get_scheduled_jobs()
 
+# ------------------- Admin Routes -------------------
+@server.route("/admin/profiling/start", methods=["POST"])
+def admin_start_profiling():
+    raw_duration = request.args.get("duration", "30")
+    try:
+        duration = float(raw_duration)
+        output = start_profiling(duration=duration)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid duration {raw_duration!r}: {e}"}), 400
+    if output is None:
+        return jsonify({"status": "already running"}), 409
+    return jsonify({"status": "started", "output": str(output), "duration": duration})
+
+@server.route("/admin/profiling/stop", methods=["POST"])
+def admin_stop_profiling():
+    output = stop_profiling()
+    return jsonify({"status": "stopped", "output": str(output) if output else None})
+
+@server.route("/admin/profiling/slow-slices")
+def admin_slow_slices():
+    return jsonify(slow_slices.slowest())
+
+@server.route("/admin/profiling/slow-slices/reset", methods=["POST"])
+def admin_reset_slow_slices():
+    slow_slices.reset()
+    return jsonify({"status": "reset"})
+
 if __name__ == "__main__":
     from twap_engine import launch_system
     launch_system()
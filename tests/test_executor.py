@@ -0,0 +1,119 @@
+from datetime import datetime
+
+import ccxt
+import pytest
+
+from twap_engine import executor
+from twap_engine.executor import client_order_id, lookup_slice_order
+
+CONFIG = {
+    "exchange": "bybit",
+    "api_key": "key-123",
+    "api_secret": "secret-456",
+    "password": None,
+    "symbol": "BTC/USDT",
+    "testnet": True
+}
+SENT_AT = datetime(2026, 1, 1, 12, 0, 0)
+SENT_AT_MS = int(SENT_AT.timestamp() * 1000)
+
+
+class FakeExchange:
+    """Oldest-first order history that honours since/limit, like ccxt's unified methods."""
+
+    def __init__(self, orders, now_ms=None):
+        self.orders = sorted(orders, key=lambda o: o["timestamp"])
+        self.now_ms = now_ms or SENT_AT_MS + 24 * 3600 * 1000
+        self.has = {"fetchOrder": True, "fetchOpenOrders": True, "fetchClosedOrders": True}
+        self.closed_calls = []
+
+    def milliseconds(self):
+        return self.now_ms
+
+    def fetch_order(self, id, symbol, params):
+        # What ccxt's bybit does on unified accounts
+        raise ccxt.ArgumentsRequired("fetchOrder() requires an order id on unified accounts")
+
+    def fetch_open_orders(self, symbol):
+        return []
+
+    def fetch_closed_orders(self, symbol, since=None, limit=None):
+        self.closed_calls.append(since)
+        return [dict(o) for o in self.orders if o["timestamp"] >= since][:limit]
+
+
+def history(count, start_ms=SENT_AT_MS, target_at=None):
+    orders = [{"id": str(i), "timestamp": start_ms + i * 1000, "clientOrderId": f"other{i}"} for i in range(count)]
+    if target_at is not None:
+        orders[target_at]["clientOrderId"] = client_order_id("job", 2)
+    return orders
+
+
+@pytest.fixture
+def use_exchange(monkeypatch):
+    def install(exchange):
+        monkeypatch.setattr(executor, "_lookup_exchanges", {})
+        monkeypatch.setattr(executor, "build_exchange", lambda *args: exchange)
+        return exchange
+    return install
+
+
+def test_client_order_id_is_deterministic_and_fits_exchange_limits():
+    first = client_order_id("3f2c9a1e-0000-4000-8000-000000000000", 7)
+    assert first == client_order_id("3f2c9a1e-0000-4000-8000-000000000000", 7)
+    assert first != client_order_id("3f2c9a1e-0000-4000-8000-000000000000", 8)
+    assert len(first) == 32 and first.isalnum()
+
+
+def test_scan_pages_forward_from_the_send_time(use_exchange):
+    exchange = use_exchange(FakeExchange(history(180, target_at=170)))
+
+    order = lookup_slice_order(CONFIG, "job", 2, SENT_AT)
+
+    assert order["id"] == "170"
+    assert len(exchange.closed_calls) == 4
+    assert exchange.closed_calls[0] <= SENT_AT_MS
+
+
+def test_scan_returns_none_once_history_is_exhausted(use_exchange):
+    use_exchange(FakeExchange(history(120)))
+    assert lookup_slice_order(CONFIG, "job", 2, SENT_AT) is None
+
+
+def test_scan_returns_none_once_it_passes_the_present(use_exchange):
+    use_exchange(FakeExchange(history(200), now_ms=SENT_AT_MS + 60 * 1000))
+    assert lookup_slice_order(CONFIG, "job", 2, SENT_AT) is None
+
+
+def test_scan_raises_when_cut_off(use_exchange, monkeypatch):
+    monkeypatch.setattr(executor, "LOOKUP_MAX_PAGES", 2)
+    use_exchange(FakeExchange(history(500, target_at=400)))
+
+    with pytest.raises(ccxt.ExchangeError):
+        lookup_slice_order(CONFIG, "job", 2, SENT_AT)
+
+
+def test_scan_raises_when_history_stops_advancing(use_exchange):
+    # A full page of orders sharing one timestamp can't be paged past
+    orders = [{"id": str(i), "timestamp": SENT_AT_MS, "clientOrderId": f"other{i}"} for i in range(60)]
+    use_exchange(FakeExchange(orders))
+
+    with pytest.raises(ccxt.ExchangeError):
+        lookup_slice_order(CONFIG, "job", 2, SENT_AT)
+
+
+def test_lookup_reuses_one_client_per_account(monkeypatch):
+    built = []
+
+    def build(*args):
+        built.append(args)
+        return FakeExchange([])
+
+    monkeypatch.setattr(executor, "_lookup_exchanges", {})
+    monkeypatch.setattr(executor, "build_exchange", build)
+
+    for step in (1, 2, 3):
+        lookup_slice_order(CONFIG, "job", step, SENT_AT)
+    lookup_slice_order(dict(CONFIG, api_key="other-key"), "job", 1, SENT_AT)
+
+    assert len(built) == 2
@@ -0,0 +1,237 @@
+import os
+import queue
+
+import pytest
+
+from twap_engine.db import init_storage
+from twap_engine.encryption_utils import generate_key
+from twap_engine.journal import JobJournal
+from twap_engine.scheduler_twap import OrderScheduler
+
+CONFIG = {
+    "exchange": "bybit",
+    "api_key": "key-123",
+    "api_secret": "secret-456",
+    "password": None,
+    "symbol": "BTC/USDT",
+    "side": "buy",
+    "total_size": 0.3,
+    "num_trades": 3,
+    "delay_seconds": 10,
+    "testnet": True,
+    "price_limit": None
+}
+T0 = "2026-01-01T00:00:00"
+T1 = "2026-01-01T00:00:10"
+T2 = "2026-01-01T00:00:20"
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    # The key file and database both live in the working directory
+    monkeypatch.chdir(tmp_path)
+    generate_key()
+    init_storage()
+    return JobJournal(tmp_path / "jobs.journal", tmp_path / "jobs.snapshot", fsync=False)
+
+
+def reopen(journal):
+    journal.close()
+    return JobJournal(journal.journal_file, journal.snapshot_file, fsync=False)
+
+
+def recover(journal):
+    return {job["job_id"]: job for job in reopen(journal).recover()}
+
+
+def test_torn_tail_is_skipped(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_acknowledged("a", 1, T1)
+    journal.close()
+    with open(journal.journal_file, "a") as f:
+        f.write('{"event": "acknowledged", "job_id": "a", "st')
+
+    restarted = reopen(journal)
+    jobs = {job["job_id"]: job for job in restarted.recover()}
+    assert jobs["a"]["completed"] == 1
+
+    # Entries written after recovery must not be glued onto the torn line
+    restarted.record_acknowledged("a", 2, T2)
+    assert recover(restarted)["a"]["completed"] == 2
+
+
+def test_crash_between_snapshot_and_truncate_loses_nothing(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_scheduled("b", CONFIG, T0)
+    journal.record_acknowledged("a", 1, T1)
+    journal.record_cancelled("b")
+    journal.close()
+    pre_compaction = journal.journal_file.read_bytes()
+
+    journal._compact()
+    journal.close()
+    # Simulate the process dying after the snapshot rename but before truncation
+    journal.journal_file.write_bytes(pre_compaction)
+
+    jobs = recover(journal)
+    assert set(jobs) == {"a"}
+    assert jobs["a"]["completed"] == 1
+    assert jobs["a"]["next_trigger"].isoformat() == T1
+
+
+def test_unacknowledged_dispatch_resumes_at_acked(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_dispatched_batch([("a", 1, T1)])
+    journal.record_acknowledged("a", 1, T1)
+    journal.record_dispatched_batch([("a", 2, T2)])
+
+    job = recover(journal)["a"]
+    assert job["completed"] == 1
+    assert job["dispatched"] == 2
+    assert job["next_trigger"].isoformat() == T1
+    assert job["config"]["api_secret"] == "secret-456"
+
+
+def test_cancelled_and_completed_jobs_are_dropped(journal):
+    journal.record_scheduled("cancelled", CONFIG, T0)
+    journal.record_cancelled("cancelled")
+    journal.record_scheduled("completed", CONFIG, T0)
+    for step in (1, 2, 3):
+        journal.record_acknowledged("completed", step, T0)
+    journal.record_completed("completed")
+    journal.record_scheduled("fully-acked", CONFIG, T0)
+    for step in (1, 2, 3):
+        journal.record_acknowledged("fully-acked", step, T0)
+    journal.record_scheduled("live", CONFIG, T0)
+
+    assert set(recover(journal)) == {"live"}
+
+
+def test_late_ack_for_cancelled_job_is_ignored(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_dispatched_batch([("a", 1, T1)])
+    journal.record_cancelled("a")
+    journal.record_acknowledged("a", 1, T1)
+
+    assert recover(journal) == {}
+
+
+def test_credentials_are_not_stored_in_plaintext(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal._compact()
+
+    assert b"secret-456" not in journal.journal_file.read_bytes()
+    assert b"secret-456" not in journal.snapshot_file.read_bytes()
+
+
+def test_undecryptable_job_is_skipped(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_scheduled("b", CONFIG, T0)
+    journal.close()
+    # secret.key was regenerated since "a" and "b" were journaled
+    os.remove("secret.key")
+    generate_key()
+    journal.record_scheduled("c", CONFIG, T0)
+
+    assert set(recover(journal)) == {"c"}
+
+
+def test_damaged_snapshot_entry_is_skipped(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_scheduled("b", CONFIG, T0)
+    del journal._jobs["a"]["config"]["credentials"]
+    journal._compact()
+
+    assert set(recover(journal)) == {"b"}
+
+
+def test_restore_holds_back_unverified_slices_without_looking_them_up(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_dispatched_batch([("a", 1, T1)])
+    journal.record_scheduled("b", CONFIG, T0)
+    looked_up = []
+
+    def lookup(config, job_id, step, since):
+        looked_up.append(step)
+        return None
+
+    order_queue = queue.Queue()
+    scheduler = OrderScheduler(order_queue, journal=reopen(journal), order_lookup=lookup)
+    scheduler._restore_from_journal()
+    scheduler._dispatch_ready()
+
+    # Restoring never waits on the exchange, and "a" stays parked until it has been checked
+    assert looked_up == []
+    assert order_queue.get_nowait()["id"] == "b"
+    assert order_queue.empty()
+    pending = {order["job_id"]: order for order in scheduler.list_pending_orders()}
+    assert pending["a"]["remaining_trades"] == 3
+
+
+def test_verification_acknowledges_slices_the_exchange_already_has(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_dispatched_batch([("a", 1, T1)])
+    journal.record_dispatched_batch([("a", 2, T2)])
+    looked_up = []
+
+    def lookup(config, job_id, step, since):
+        looked_up.append(step)
+        return {"id": "x1"} if step == 1 else None
+
+    scheduler = OrderScheduler(queue.Queue(), journal=reopen(journal), order_lookup=lookup)
+    scheduler._restore_from_journal()
+
+    assert scheduler._verify_pending({}) is False
+    assert looked_up == [1, 2]
+    assert scheduler.list_pending_orders()[0]["remaining_trades"] == 2
+    assert recover(scheduler.journal)["a"]["completed"] == 1
+
+
+def test_failed_lookup_is_retried_then_recorded_as_skipped(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_dispatched_batch([("a", 1, T1)])
+
+    def lookup(config, job_id, step, since):
+        raise ConnectionError("exchange unreachable")
+
+    scheduler = OrderScheduler(queue.Queue(), journal=reopen(journal), order_lookup=lookup, lookup_attempts=2)
+    scheduler._restore_from_journal()
+    attempts = {}
+
+    # First failure: nothing journaled, slice still held back for a retry
+    assert scheduler._verify_pending(attempts) is True
+    assert scheduler.list_pending_orders()[0]["remaining_trades"] == 3
+    assert scheduler.journal._jobs["a"]["acked"] == 0
+
+    assert scheduler._verify_pending(attempts) is False
+    assert scheduler.list_pending_orders()[0]["remaining_trades"] == 2
+    assert scheduler.journal._jobs["a"]["skipped"] == [1]
+
+
+def test_verification_completes_a_fully_filled_job(journal):
+    journal.record_scheduled("a", CONFIG, T0)
+    journal.record_dispatched_batch([("a", 1, T0)])
+    journal.record_dispatched_batch([("a", 2, T0)])
+    journal.record_dispatched_batch([("a", 3, T0)])
+
+    scheduler = OrderScheduler(queue.Queue(), journal=reopen(journal), order_lookup=lambda *_: {"id": "x"})
+    scheduler._restore_from_journal()
+    scheduler._verify_pending({})
+
+    assert scheduler.list_pending_orders() == []
+    assert recover(scheduler.journal) == {}
+
+
+def test_failed_dispatch_write_leaves_task_untouched(journal):
+    order_queue = queue.Queue()
+    scheduler = OrderScheduler(order_queue, journal=journal)
+    scheduler.schedule_order(CONFIG)
+
+    def fail(dispatches):
+        raise OSError("disk full")
+    journal.record_dispatched_batch = fail
+
+    with pytest.raises(OSError):
+        scheduler._dispatch_ready()
+    assert order_queue.empty()
+    assert scheduler.list_pending_orders()[0]["remaining_trades"] == 3
@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+
+import pytest
+
+from twap_engine.profiler import SliceTimer, SlowSliceRecorder, StackSampler
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # profiles/, logs/, secret.key and the database are all relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    thread = threading.Thread(target=spin, daemon=True, name="Busy")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.fixture
+def idle_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, daemon=True, name="Idle")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def run_window(sampler, duration=0.2):
+    output = sampler.start(duration=duration)
+    sampler._thread.join()
+    return output.read_text().splitlines()
+
+
+def timer_taking(seconds, step):
+    timer = SliceTimer("job", step)
+    timer._start = time.perf_counter() - seconds
+    return timer
+
+
+@pytest.mark.parametrize("duration", [0, -5, float("nan"), float("inf"), "30", None])
+def test_start_rejects_non_positive_or_non_finite_duration(duration):
+    sampler = StackSampler()
+    with pytest.raises(ValueError):
+        sampler.start(duration=duration)
+    assert not sampler.is_running()
+
+
+def test_start_returns_none_while_a_window_is_running():
+    sampler = StackSampler()
+    assert sampler.start(duration=5) is not None
+    try:
+        assert sampler.start(duration=5) is None
+    finally:
+        sampler.stop()
+
+
+def test_window_that_runs_out_calls_on_finish(busy_thread):
+    finished = []
+    sampler = StackSampler(on_finish=lambda: finished.append(True))
+    sampler.watch(busy_thread)
+    run_window(sampler, duration=0.05)
+    assert finished == [True]
+
+
+def test_output_is_collapsed_stacks_with_line_numbers(busy_thread):
+    sampler = StackSampler(interval=0.002)
+    sampler.watch(busy_thread)
+    lines = run_window(sampler)
+
+    assert lines
+    frame = r"[^;]+ \([^;:]+:\d+\)"
+    pattern = re.compile(rf"^Busy(;{frame})+ \d+$")
+    assert all(pattern.match(line) for line in lines), lines
+    assert any("spin (test_profiler.py:" in line for line in lines)
+
+
+def test_idle_stacks_are_dropped_by_default(idle_thread):
+    sampler = StackSampler(interval=0.002)
+    sampler.watch(idle_thread)
+    assert run_window(sampler) == []
+    assert sampler._idle_samples > 0
+
+
+def test_idle_stacks_are_tagged_when_included(idle_thread):
+    sampler = StackSampler(interval=0.002, include_idle=True)
+    sampler.watch(idle_thread)
+    lines = run_window(sampler)
+
+    assert lines
+    assert all(line.rsplit(" ", 1)[0].endswith(";[idle]") for line in lines)
+
+
+def test_slow_slice_recorder_keeps_slowest_sorted():
+    recorder = SlowSliceRecorder(size=3)
+    for step, seconds in enumerate([0.05, 0.5, 0.01, 0.3, 0.2, 0.02]):
+        recorder.record(timer_taking(seconds, step))
+
+    assert [entry["step"] for entry in recorder.slowest()] == [1, 3, 4]
+    totals = [entry["total_ms"] for entry in recorder.slowest()]
+    assert totals == sorted(totals, reverse=True)
+
+
+def test_slow_slice_recorder_reset():
+    recorder = SlowSliceRecorder(size=3)
+    recorder.record(timer_taking(0.5, 1))
+    recorder.reset()
+    assert recorder.slowest() == []
+
+    recorder.record(timer_taking(0.01, 2))
+    assert [entry["step"] for entry in recorder.slowest()] == [2]
+
+
+def test_slice_timer_breaks_down_sections():
+    timer = SliceTimer("job", 1)
+    with timer.section("fetch_ticker"):
+        time.sleep(0.01)
+    with timer.section("fetch_ticker"):
+        time.sleep(0.01)
+
+    assert timer.sections["fetch_ticker"] >= 0.02
+    assert timer.elapsed() >= timer.sections["fetch_ticker"]
+
+
+@pytest.fixture
+def admin_client(workdir):
+    import app_dash
+    from twap_engine.profiler import stack_sampler
+
+    yield app_dash.server.test_client()
+    stack_sampler.stop()
+
+
+@pytest.mark.parametrize("duration", ["abc", "0", "-1", "nan", "inf"])
+def test_admin_start_rejects_bad_duration(admin_client, duration):
+    response = admin_client.post(f"/admin/profiling/start?duration={duration}")
+    assert response.status_code == 400
+
+
+def test_admin_start_conflicts_while_running(admin_client):
+    first = admin_client.post("/admin/profiling/start?duration=5")
+    assert first.status_code == 200
+    assert first.get_json()["status"] == "started"
+
+    second = admin_client.post("/admin/profiling/start?duration=5")
+    assert second.status_code == 409
+
+    stopped = admin_client.post("/admin/profiling/stop")
+    assert stopped.get_json()["status"] == "stopped"
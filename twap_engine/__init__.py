@@ -1,6 +1,8 @@
 from .scheduler_twap import OrderScheduler
-from .executor import OrderExecutor
+from .executor import OrderExecutor, lookup_slice_order
 from .db import init_storage
+from .journal import JobJournal
+from .profiler import stack_sampler, install_signal_handler
 import queue
 import logging
 
@@ -12,11 +14,17 @@ init_storage()
 # Step 2: Create a shared queue for TWAP job execution
 order_queue = queue.Queue()
 
-# Step 3: Instantiate scheduler and executor for TWAP
-order_scheduler = OrderScheduler(queue=order_queue)
+# Step 3: Instantiate scheduler and executor for TWAP; live job state is journaled for crash recovery
+job_journal = JobJournal()
+order_scheduler = OrderScheduler(queue=order_queue, journal=job_journal, order_lookup=lookup_slice_order)
 order_executor = OrderExecutor(order_queue=order_queue, order_scheduler=order_scheduler)
 
-# Step 4: Start everything
+# Step 4: Register engine threads with the sampling profiler
+stack_sampler.watch(order_scheduler.thread)
+stack_sampler.watch(order_executor)
+
+# Step 5: Start everything
 def launch_system():
     order_scheduler.start()
     order_executor.start()
+    install_signal_handler()
@@ -2,16 +2,100 @@ import threading
 import queue
 import ccxt
 import datetime
+import hashlib
 import time
 
 from .db import log_submitted_order
+from .profiler import SliceTimer, slow_slices
 from twap_engine.logger import setup_logger
 
 logger = setup_logger("executor")
 
+def client_order_id(job_id, step):
+    # Deterministic per slice; 32 alphanumeric chars fits every supported exchange's limit
+    return "twap" + hashlib.sha1(f"{job_id}:{step}".encode()).hexdigest()[:28]
+
+def build_exchange(exchange_name, credentials, test_mode):
+    exchange_class = getattr(ccxt, exchange_name.lower())
+    exchange = exchange_class(credentials)
+    if test_mode and hasattr(exchange, "set_sandbox_mode"):
+        exchange.set_sandbox_mode(True)
+    return exchange
+
+_lookup_exchanges = {}
+_lookup_lock = threading.Lock()
+
+def _lookup_exchange(config):
+    # One client per account for recovery lookups, instead of a new client (and load_markets) per slice
+    test_mode = bool(config.get("testnet", False))
+    key = (config["exchange"].lower(), config["api_key"], test_mode)
+    with _lookup_lock:
+        exchange = _lookup_exchanges.get(key)
+        if exchange is None:
+            credentials = {"apiKey": config["api_key"], "secret": config["api_secret"]}
+            if config.get("password"):
+                credentials["password"] = config["password"]
+            exchange = _lookup_exchanges[key] = build_exchange(config["exchange"], credentials, test_mode)
+        return exchange
+
+LOOKUP_PAGE_SIZE = 50
+LOOKUP_MAX_PAGES = 40
+LOOKUP_CLOCK_SKEW_MS = 5 * 60 * 1000
+
+def lookup_slice_order(config, job_id, step, since):
+    """Return the exchange's order for a slice, or None if the exchange never received it.
+
+    ``since`` is the earliest time the slice could have been sent. Raises when the
+    exchange can't be asked, or its history can't be scanned back to ``since``, so
+    callers can treat the outcome as unknown."""
+    exchange = _lookup_exchange(config)
+    symbol = config["symbol"]
+    client_id = client_order_id(job_id, step)
+
+    if exchange.has.get("fetchOrder"):
+        try:
+            return exchange.fetch_order(None, symbol, {"clientOrderId": client_id})
+        except ccxt.OrderNotFound:
+            return None
+        except (ccxt.ArgumentsRequired, ccxt.NotSupported, ccxt.BadRequest):
+            pass  # No lookup by client id on this exchange; scan its order history instead
+
+    if not exchange.has.get("fetchClosedOrders"):
+        raise ccxt.NotSupported(f"{config['exchange']} cannot look up orders by client id")
+    if exchange.has.get("fetchOpenOrders"):
+        for order in exchange.fetch_open_orders(symbol):
+            if order.get("clientOrderId") == client_id:
+                return order
+    since_ms = int(since.timestamp() * 1000) - LOOKUP_CLOCK_SKEW_MS
+    return _scan_closed_orders(exchange, symbol, client_id, since_ms)
+
+def _scan_closed_orders(exchange, symbol, client_id, since_ms):
+    # Page forward from the earliest possible send time up to now; market slices close
+    # immediately, so a single default page would miss them on a busy symbol
+    until_ms = exchange.milliseconds()
+    cursor = since_ms
+    seen = set()
+    for _ in range(LOOKUP_MAX_PAGES):
+        page = exchange.fetch_closed_orders(symbol, cursor, LOOKUP_PAGE_SIZE)
+        page.sort(key=lambda o: o.get("timestamp") or 0)
+        fresh = [o for o in page if o.get("id") not in seen]
+        for order in fresh:
+            if order.get("clientOrderId") == client_id:
+                return order
+
+        if not fresh:
+            if len(page) >= LOOKUP_PAGE_SIZE:
+                raise ccxt.ExchangeError(f"Order history scan for {client_id} stopped advancing at {cursor}")
+            return None  # Reached the end of the history
+        seen.update(o.get("id") for o in fresh)
+        cursor = max(cursor, fresh[-1].get("timestamp") or cursor)
+        if cursor >= until_ms:
+            return None
+    raise ccxt.ExchangeError(f"Order history scan for {client_id} cut off after {LOOKUP_MAX_PAGES} pages")
+
 class OrderExecutor(threading.Thread):
     def __init__(self, order_queue, order_scheduler):
-        super().__init__(daemon=True)
+        super().__init__(daemon=True, name="OrderExecutor")
         self.order_queue = order_queue
         self.order_scheduler = order_scheduler
         self._stop_event = threading.Event()
@@ -42,18 +126,18 @@ class OrderExecutor(threading.Thread):
         chunk_size = task["total_size"] / task["num_trades"]
         test_mode = bool(task.get("testnet", False))
         price_cap = task.get("price_limit")
+        timer = SliceTimer(task.get("id"), task.get("executed", 0))
 
         try:
-            exchange_class = getattr(ccxt, exchange_name.lower())
-            credentials = {"apiKey": api_key, "secret": api_secret}
-            if password:
-                credentials["password"] = password
+            with timer.section("exchange_init"):
+                credentials = {"apiKey": api_key, "secret": api_secret}
+                if password:
+                    credentials["password"] = password
 
-            exchange = exchange_class(credentials)
-            if test_mode and hasattr(exchange, "set_sandbox_mode"):
-                exchange.set_sandbox_mode(True)
+                exchange = build_exchange(exchange_name, credentials, test_mode)
 
-            ticker = exchange.fetch_ticker(symbol)
+            with timer.section("fetch_ticker"):
+                ticker = exchange.fetch_ticker(symbol)
             current_market_price = float(ticker["last"])
             logger.info(f"[Executor] Current price for {symbol}: {current_market_price}")
 
@@ -63,15 +147,22 @@ class OrderExecutor(threading.Thread):
                 if side == "sell" and current_market_price < price_cap:
                     raise Exception(f"Sell limit missed: {current_market_price} < {price_cap}")
 
-            if side == "buy":
-                credentials["createMarketBuyOrderRequiresPrice"] = True
-                order_response = exchange.create_order(symbol, 'market', side, chunk_size, current_market_price, credentials)
-            else:
-                order_response = exchange.create_order(symbol, 'market', side, chunk_size, None, credentials)
+            step = task.get("executed", 0)
+            # Lets crash recovery find this slice on the exchange instead of sending it twice
+            credentials["clientOrderId"] = client_order_id(task.get("id"), step)
+
+            with timer.section("create_order"):
+                if side == "buy":
+                    credentials["createMarketBuyOrderRequiresPrice"] = True
+                    order_response = exchange.create_order(symbol, 'market', side, chunk_size, current_market_price, credentials)
+                else:
+                    order_response = exchange.create_order(symbol, 'market', side, chunk_size, None, credentials)
+
+            with timer.section("journal"):
+                self.order_scheduler.acknowledge_slice(task)
 
             logger.info(f"[Executor] Order response: {order_response}")
 
-            step = task.get("executed", 0)
             submitted_log = {
                 "timestamp": datetime.datetime.now().isoformat(),
                 "exchange": exchange_name,
@@ -85,7 +176,8 @@ class OrderExecutor(threading.Thread):
                 "num_trades": task.get("num_trades"),
                 "exchange_order_id": order_response.get("id")
             }
-            log_submitted_order(submitted_log)
+            with timer.section("db"):
+                log_submitted_order(submitted_log)
 
         except Exception as e:
             logger.error(f"[Executor] Order error: {e}")
@@ -93,6 +185,8 @@ class OrderExecutor(threading.Thread):
             if order_id:
                 self.order_scheduler.cancel_order(order_id)
                 logger.info(f"[Executor] Order {order_id} cancelled due to error.")
+        finally:
+            slow_slices.record(timer)
 
     def stop(self):
         self._stop_event.set()
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+
+from datetime import datetime
+from pathlib import Path
+from twap_engine.logger import setup_logger
+from .encryption_utils import encrypt_data, decrypt_data
+
+logger = setup_logger("journal")
+
+JOURNAL_FILE = Path("twap_jobs.journal")
+SNAPSHOT_FILE = Path("twap_jobs.snapshot")
+
+CREDENTIAL_FIELDS = ("api_key", "api_secret", "password")
+
+
+class JobJournal:
+    """Append-only log of TWAP job lifecycle events, compacted into periodic snapshots.
+
+    Replaying the latest snapshot plus the events written after it yields every job
+    that was neither cancelled nor completed, with its progress set to the last
+    acknowledged slice, so acknowledged slices are never sent again. Slices that were
+    dispatched but not acknowledged before a crash are reported via ``dispatched`` so
+    the scheduler can look them up on the exchange before resending."""
+
+    def __init__(self, journal_file=JOURNAL_FILE, snapshot_file=SNAPSHOT_FILE, snapshot_every=1000, fsync=True):
+        self.journal_file = Path(journal_file)
+        self.snapshot_file = Path(snapshot_file)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._seq = 0
+        self._since_snapshot = 0
+        self._file = None
+
+    # ---------- Recovery ----------
+    def recover(self):
+        with self._lock:
+            self._jobs = {}
+            self._seq = 0
+            if self.snapshot_file.exists():
+                with open(self.snapshot_file) as f:
+                    snapshot = json.load(f)
+                self._seq = snapshot["seq"]
+                self._jobs = snapshot["jobs"]
+
+            replayed = 0
+            if self.journal_file.exists():
+                with open(self.journal_file) as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Torn write at the tail of the journal; nothing after it is valid
+                            logger.warning(f"[Journal] Ignoring truncated entry after seq {self._seq}")
+                            break
+                        if event["seq"] <= self._seq:
+                            continue
+                        self._apply(event)
+                        self._seq = event["seq"]
+                        replayed += 1
+
+            # Start a clean journal so new entries never follow a torn line
+            self._compact()
+
+            jobs = []
+            for job_id, job in self._jobs.items():
+                try:
+                    if job["acked"] >= job["config"]["num_trades"]:
+                        continue
+                    jobs.append(self._restore_job(job_id, job))
+                except Exception as err:
+                    # Regenerated secret.key or a damaged entry: leave it in the journal, start without it
+                    logger.error(f"[Journal] Could not restore job {job_id}, skipping it: {err!r}")
+            resent = sum(1 for job in jobs if job["dispatched"] > job["completed"])
+            logger.info(f"[Journal] Recovered {len(jobs)} jobs ({replayed} events replayed, {resent} unacknowledged slices to verify)")
+            return jobs
+
+    def _restore_job(self, job_id, job):
+        config = dict(job["config"])
+        config.update(decrypt_data(config.pop("credentials").encode()))
+        return {
+            "job_id": job_id,
+            "config": config,
+            "completed": job["acked"],
+            "dispatched": job["dispatched"],
+            "next_trigger": datetime.fromisoformat(job["next_trigger"])
+        }
+
+    # ---------- Lifecycle events ----------
+    def record_scheduled(self, job_id, config, next_trigger):
+        stored = {k: v for k, v in config.items() if k not in CREDENTIAL_FIELDS}
+        stored["credentials"] = encrypt_data({k: config.get(k) for k in CREDENTIAL_FIELDS}).decode()
+        self._append({"event": "scheduled", "job_id": job_id, "config": stored, "next_trigger": next_trigger})
+
+    def record_dispatched_batch(self, dispatches):
+        # One write and one fsync for a whole scheduler tick of (job_id, step, next_trigger)
+        self._append_many([{"event": "dispatched", "job_id": job_id, "step": step, "next_trigger": next_trigger}
+                           for job_id, step, next_trigger in dispatches])
+
+    def record_acknowledged(self, job_id, step, next_trigger):
+        self._append({"event": "acknowledged", "job_id": job_id, "step": step, "next_trigger": next_trigger})
+
+    def record_skipped(self, job_id, step, next_trigger):
+        # Slice given up on without knowing whether it reached the exchange
+        self._append({"event": "skipped", "job_id": job_id, "step": step, "next_trigger": next_trigger})
+
+    def record_cancelled(self, job_id):
+        self._append({"event": "cancelled", "job_id": job_id})
+
+    def record_completed(self, job_id):
+        self._append({"event": "completed", "job_id": job_id})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ---------- Internals ----------
+    def _apply(self, event):
+        job_id = event["job_id"]
+        kind = event["event"]
+        if kind == "scheduled":
+            self._jobs[job_id] = {
+                "config": event["config"],
+                "dispatched": 0,
+                "acked": 0,
+                "next_trigger": event["next_trigger"]
+            }
+            return
+
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if kind == "dispatched":
+            job["dispatched"] = max(job["dispatched"], event["step"])
+        elif kind in ("acknowledged", "skipped"):
+            # "acked" is the resume point; skipped steps move it too but are kept apart from real acks
+            if event["step"] > job["acked"]:
+                job["acked"] = event["step"]
+                job["next_trigger"] = event["next_trigger"]
+            if kind == "skipped":
+                job.setdefault("skipped", []).append(event["step"])
+        elif kind in ("cancelled", "completed"):
+            del self._jobs[job_id]
+
+    def _append(self, event):
+        self._append_many([event])
+
+    def _append_many(self, events):
+        if not events:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_file, "ab")
+            lines = []
+            for event in events:
+                event["seq"] = self._seq + len(lines) + 1
+                lines.append(json.dumps(event) + "\n")
+
+            offset = self._file.tell()
+            try:
+                self._file.write("".join(lines).encode())
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except OSError:
+                self._discard_partial_write(offset)
+                raise
+
+            # Only advance in-memory state once the events are durable
+            for event in events:
+                self._apply(event)
+            self._seq += len(events)
+
+            self._since_snapshot += len(events)
+            if self._since_snapshot >= self.snapshot_every:
+                self._compact()
+
+    def _discard_partial_write(self, offset):
+        # Cut the journal back so the next append never follows a torn line
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        try:
+            os.truncate(self.journal_file, offset)
+        except OSError as err:
+            logger.error(f"[Journal] Could not truncate journal after failed write: {err}")
+
+    def _compact(self):
+        # Snapshot first, then truncate: a crash in between leaves events the snapshot already covers
+        tmp_path = self.snapshot_file.with_suffix(self.snapshot_file.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"seq": self._seq, "jobs": self._jobs}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_file)
+
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_file, "wb")
+        self._since_snapshot = 0
@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import math
+import heapq
+import signal
+import itertools
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from twap_engine.logger import setup_logger
+
+logger = setup_logger("profiler")
+
+PROFILE_DIR = Path("profiles")
+
+# Leaf frames where an engine thread is parked rather than using CPU: the
+# executor's queue.get() and the scheduler's shutdown-event wait both end in Condition.wait
+IDLE_LEAVES = {("threading.py", "wait")}
+
+
+class StackSampler:
+    """Samples the stacks of watched engine threads and writes them out in
+    collapsed-stack format (one "frame;frame;frame count" line per stack),
+    which speedscope and flamegraph.pl load directly. Frames are labelled with the
+    line being executed; stacks parked in an idle wait are counted but not written
+    unless include_idle is set, in which case they are tagged with an [idle] leaf."""
+
+    def __init__(self, interval=0.01, on_finish=None, include_idle=False):
+        self.interval = interval
+        self.on_finish = on_finish
+        self.include_idle = include_idle
+        self._watched = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._samples = Counter()
+        self._idle_samples = 0
+        self._output = None
+        # Per code object: ("name (file", is_idle_leaf), so sampling does no path handling
+        self._code_info = {}
+
+    def watch(self, thread):
+        with self._lock:
+            if thread not in self._watched:
+                self._watched.append(thread)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=30, output=None):
+        if not isinstance(duration, (int, float)) or not math.isfinite(duration) or duration <= 0:
+            raise ValueError(f"Profiling duration must be a positive number of seconds, got {duration!r}")
+        with self._lock:
+            if self.is_running():
+                return None
+            PROFILE_DIR.mkdir(exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            self._output = Path(output) if output else PROFILE_DIR / f"engine-{stamp}.folded"
+            self._samples = Counter()
+            self._idle_samples = 0
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True, name="StackSampler")
+            self._thread.start()
+            logger.info(f"[Profiler] Sampling started (duration={duration}s, output={self._output})")
+            return self._output
+
+    def stop(self):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return None
+        self._stop_event.set()
+        thread.join()
+        return self._output
+
+    def _run(self, duration):
+        deadline = time.monotonic() + duration
+        while not self._stop_event.wait(self.interval):
+            if time.monotonic() >= deadline:
+                break
+            self._sample()
+        self._dump()
+        if self.on_finish is not None:
+            self.on_finish()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        with self._lock:
+            watched = list(self._watched)
+        for thread in watched:
+            frame = frames.get(thread.ident)
+            if frame is None:
+                continue
+            idle = self._describe(frame.f_code)[1]
+            if idle:
+                self._idle_samples += 1
+                if not self.include_idle:
+                    continue
+
+            stack = ["[idle]"] if idle else []
+            while frame is not None:
+                stack.append(f"{self._describe(frame.f_code)[0]}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(thread.name)
+            self._samples[";".join(reversed(stack))] += 1
+
+    def _describe(self, code):
+        info = self._code_info.get(code)
+        if info is None:
+            filename = os.path.basename(code.co_filename)
+            info = (f"{code.co_name} ({filename}", (filename, code.co_name) in IDLE_LEAVES)
+            self._code_info[code] = info
+        return info
+
+    def _dump(self):
+        with open(self._output, "w") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+        total = sum(self._samples.values())
+        logger.info(f"[Profiler] Sampling stopped. {total} samples written to {self._output} ({self._idle_samples} idle)")
+
+
+class SliceTimer:
+    """Wall-clock breakdown of a single slice execution."""
+
+    def __init__(self, job_id, step):
+        self.job_id = job_id
+        self.step = step
+        self.started_at = datetime.now()
+        self.sections = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def section(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - t0
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+
+class SlowSliceRecorder:
+    """Keeps the slowest N slice executions seen since the last reset."""
+
+    def __init__(self, size=20):
+        self.size = size
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        total = timer.elapsed()
+        entry = {
+            "job_id": timer.job_id,
+            "step": timer.step,
+            "started_at": timer.started_at.isoformat(),
+            "total_ms": round(total * 1000, 3),
+            "sections_ms": {k: round(v * 1000, 3) for k, v in timer.sections.items()}
+        }
+        item = (total, next(self._counter), entry)
+        with self._lock:
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            elif total > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self):
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def reset(self):
+        with self._lock:
+            self._heap = []
+
+    def dump(self, path=None):
+        PROFILE_DIR.mkdir(exist_ok=True)
+        path = Path(path) if path else PROFILE_DIR / "slow_slices.json"
+        with open(path, "w") as f:
+            json.dump(self.slowest(), f, indent=2)
+        return path
+
+
+slow_slices = SlowSliceRecorder()
+stack_sampler = StackSampler(on_finish=slow_slices.dump)
+
+
+# ---------- Runtime toggles ----------
+def start_profiling(duration=30, output=None):
+    output = stack_sampler.start(duration=duration, output=output)
+    if output is not None:
+        # Each profiling window gets its own slow-slice record
+        slow_slices.reset()
+    return output
+
+def stop_profiling():
+    return stack_sampler.stop()
+
+def toggle_profiling(duration=30):
+    if stack_sampler.is_running():
+        return stop_profiling()
+    return start_profiling(duration=duration)
+
+def install_signal_handler(signum=getattr(signal, "SIGUSR1", None), duration=30):
+    # Signal handlers can only be installed from the main thread, and SIGUSR1 is POSIX-only
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+    # Hand the work to a short-lived thread so the interrupted main loop isn't blocked on join/file I/O
+    signal.signal(signum, lambda *_: threading.Thread(
+        target=toggle_profiling, kwargs={"duration": duration}, daemon=True, name="ProfilerToggle"
+    ).start())
+    logger.info(f"[Profiler] Send signal {signum} to toggle profiling.")
+    return True
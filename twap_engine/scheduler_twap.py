@@ -1,5 +1,4 @@
 import threading
-import time
 import uuid
 
 from datetime import datetime, timedelta
@@ -14,9 +13,11 @@ class ScheduledTWAPTask:
         self.details = task_data
         self.completed = 0
         self.next_trigger = datetime.now()
+        # Restored steps whose fate on the exchange is still being looked up
+        self.unverified = []
 
     def is_ready(self):
-        return datetime.now() >= self.next_trigger
+        return not self.unverified and datetime.now() >= self.next_trigger
 
     def mark_progress(self):
         self.completed += 1
@@ -25,27 +26,128 @@ class ScheduledTWAPTask:
 
 
 class OrderScheduler:
-    def __init__(self, queue, interval=1):
+    def __init__(self, queue, interval=1, journal=None, order_lookup=None, lookup_attempts=5, lookup_retry=30):
         self.queue = queue
         self.interval = interval
+        self.journal = journal
+        self.order_lookup = order_lookup
+        self.lookup_attempts = lookup_attempts
+        self.lookup_retry = lookup_retry
         self._shutdown = threading.Event()
-        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="OrderScheduler")
+        self._verifier = None
         self._tasks = []
         self._id_lock = threading.Lock()
 
+    @property
+    def thread(self):
+        return self._thread
+
     def start(self):
+        if self.journal is not None:
+            self._restore_from_journal()
+            if any(task.unverified for task in self._tasks):
+                # Exchange lookups are slow; run them off the startup path
+                self._verifier = threading.Thread(target=self._verify_restored, daemon=True, name="OrderVerifier")
+                self._verifier.start()
         logger.info("[Scheduler] OrderScheduler thread running...")
         self._thread.start()
 
+    def _restore_from_journal(self):
+        restored = []
+        now = datetime.now()
+        for job in self.journal.recover():
+            task = ScheduledTWAPTask(job["job_id"], job["config"])
+            task.completed = job["completed"]
+            task.next_trigger = job["next_trigger"]
+            if self.order_lookup is not None:
+                # Dispatched but never acknowledged: held back until the exchange has been asked about them
+                task.unverified = list(range(task.completed + 1, job["dispatched"] + 1))
+            if not task.unverified:
+                task.next_trigger = max(task.next_trigger, now)
+            restored.append(task)
+
+        with self._id_lock:
+            self._tasks.extend(restored)
+        held = sum(1 for task in restored if task.unverified)
+        logger.info(f"[Scheduler] Restored {len(restored)} tasks from journal ({held} awaiting exchange lookups).")
+
+    def _verify_restored(self):
+        attempts = {}
+        while not self._shutdown.is_set():
+            if not self._verify_pending(attempts):
+                return
+            self._shutdown.wait(self.lookup_retry)
+
+    def _verify_pending(self, attempts):
+        # One lookup pass over tasks with unverified slices; True while any are left for a retry
+        with self._id_lock:
+            pending = [task for task in self._tasks if task.unverified]
+        for task in pending:
+            if self._shutdown.is_set():
+                break
+            self._verify_task(task, attempts)
+        with self._id_lock:
+            return any(task.unverified for task in self._tasks)
+
+    def _verify_task(self, task, attempts):
+        while task.unverified:
+            step = task.unverified[0]
+            try:
+                # next_trigger is this step's due time, so it cannot have been sent earlier
+                order = self.order_lookup(task.details, task.id, step, task.next_trigger)
+            except Exception as err:
+                failures = attempts[(task.id, step)] = attempts.get((task.id, step), 0) + 1
+                if failures < self.lookup_attempts:
+                    logger.warning(f"[Scheduler] Lookup of step {step} of {task.id} failed "
+                                   f"({failures}/{self.lookup_attempts}), retrying later: {err}")
+                    return
+                # Outcome still unknown: skipping under-fills, resending could duplicate a trade
+                logger.error(f"[Scheduler] Skipping step {step} of {task.id} without knowing whether "
+                             f"it reached the exchange after {failures} failed lookups: {err}")
+                self._advance_unverified(task, step, self.journal.record_skipped)
+                continue
+
+            if order is None:
+                # Never reached the exchange, so dispatch normally from this step on
+                logger.info(f"[Scheduler] Step {step} of {task.id} not found on the exchange; it will be resent.")
+                break
+            self._advance_unverified(task, step, self.journal.record_acknowledged)
+        self._release_task(task)
+
+    def _advance_unverified(self, task, step, record):
+        with self._id_lock:
+            task.mark_progress()
+            task.unverified.pop(0)
+            next_trigger = task.next_trigger.isoformat()
+        self._journal_safely(record, task.id, step, next_trigger)
+
+    def _release_task(self, task):
+        with self._id_lock:
+            task.unverified = []
+            done = task.completed >= task.details["num_trades"]
+            if done:
+                self._tasks = [t for t in self._tasks if t.id != task.id]
+            else:
+                task.next_trigger = max(task.next_trigger, datetime.now())
+        if done:
+            self._journal_safely(self.journal.record_completed, task.id)
+
     def stop(self):
         self._shutdown.set()
         self._thread.join()
+        if self._verifier is not None:
+            self._verifier.join()
         logger.info("[Scheduler] OrderScheduler stopped.")
 
     def schedule_order(self, config):
+        task_id = str(uuid.uuid4())
+        task = ScheduledTWAPTask(task_id, config)
+        # Journal before the task is visible to _run, so its dispatches always follow it in the log
+        if self.journal is not None:
+            self.journal.record_scheduled(task_id, config, task.next_trigger.isoformat())
+
         with self._id_lock:
-            task_id = str(uuid.uuid4())
-            task = ScheduledTWAPTask(task_id, config)
             self._tasks.append(task)
             logger.info(f"[Scheduler] Scheduled {task_id}: {config}")
 
@@ -72,29 +174,70 @@ class OrderScheduler:
             after = len(self._tasks)
             logger.info(f"[Scheduler] Cancelled {task_id}. Queue size: {before} → {after}")
 
+        if self.journal is not None:
+            self._journal_safely(self.journal.record_cancelled, task_id)
+
+    def acknowledge_slice(self, payload):
+        # Called by the executor once the exchange has accepted a slice
+        if self.journal is None:
+            return
+        self._journal_safely(self.journal.record_acknowledged, payload["id"], payload["executed"], payload["next_exec"])
+        if payload["executed"] >= payload["num_trades"]:
+            self._journal_safely(self.journal.record_completed, payload["id"])
+
+    def _journal_safely(self, record, *args):
+        # A journal failure must never cancel a filled slice or take down the executor thread
+        try:
+            record(*args)
+        except Exception as err:
+            logger.error(f"[Scheduler] Journal write failed ({record.__name__}): {err}")
+
     def _run(self):
         while not self._shutdown.is_set():
             try:
-                with self._id_lock:
-                    for task in list(self._tasks):
-                        if task.is_ready():
-                            done = task.mark_progress()
-
-                            payload = task.details.copy()
-                            payload["id"] = task.id
-                            payload["executed"] = task.completed
-                            payload["next_exec"] = task.next_trigger.isoformat()
-
-                            logger.info(f"[Scheduler] Dispatching {task.id} (step {task.completed}/{task.details['num_trades']})")
-                            self.queue.put(payload)
-
-                            if done:
-                                self._tasks.remove(task)
-                                logger.info(f"[Scheduler] Task {task.id} completed.")
+                self._dispatch_ready()
             except Exception as err:
                 logger.error(f"[Scheduler] Error: {err}")
 
-            time.sleep(self.interval)
+            self._shutdown.wait(self.interval)
+
+    def _dispatch_ready(self):
+        with self._id_lock:
+            ready = [task for task in self._tasks if task.is_ready()]
+        if not ready:
+            return
+
+        # Journal the whole tick in one append, outside the lock and before any task state changes:
+        # if the write fails nothing has been counted and the same slices are retried next tick
+        if self.journal is not None:
+            self.journal.record_dispatched_batch([
+                (task.id, task.completed + 1,
+                 (task.next_trigger + timedelta(seconds=task.details["delay_seconds"])).isoformat())
+                for task in ready
+            ])
+
+        with self._id_lock:
+            live = {t.id for t in self._tasks}
+            finished = set()
+            for task in ready:
+                if task.id not in live:
+                    # Cancelled while the tick was being journaled
+                    continue
+                done = task.mark_progress()
+
+                payload = task.details.copy()
+                payload["id"] = task.id
+                payload["executed"] = task.completed
+                payload["next_exec"] = task.next_trigger.isoformat()
+
+                logger.info(f"[Scheduler] Dispatching {task.id} (step {task.completed}/{task.details['num_trades']})")
+                self.queue.put(payload)
+
+                if done:
+                    finished.add(task.id)
+                    logger.info(f"[Scheduler] Task {task.id} completed.")
+            if finished:
+                self._tasks = [t for t in self._tasks if t.id not in finished]
 
     def list_pending_orders(self):
         with self._id_lock: